@@ -0,0 +1,66 @@
+"""
+Measures the real-time factor of each speed tier on a set of audio files and prints
+the results as a Markdown table. Exits with an error if the fast tier is not faster
+than the accurate tier.
+
+Usage:
+    python -m scripts.benchmark_tiers audio1.wav [audio2.mp3 ...]
+"""
+
+import sys
+import time
+
+from faster_whisper import decode_audio
+
+from src.jobs import load_model
+from src.options import TIERS, parse_options
+
+
+def benchmark(tier: str, filenames: list[str]) -> float:
+    """
+    Transcribes the files with the tier and returns the real-time factor, the
+    processing time divided by the audio duration.
+    """
+    options = parse_options({"tier": tier})
+    model = load_model(options.model)
+    sampling_rate = model.feature_extractor.sampling_rate
+
+    def transcribe(audio) -> float:
+        start_time = time.perf_counter()
+        segments, _ = model.transcribe(
+            audio,
+            beam_size=options.beam_size,
+            language=options.language,
+            vad_filter=options.vad_filter,
+        )
+        for _ in segments:
+            pass
+        return time.perf_counter() - start_time
+
+    audios = [decode_audio(filename, sampling_rate=sampling_rate) for filename in filenames]
+    # Warm up so that the first tier does not pay for the one-time initialisation
+    transcribe(audios[0][:sampling_rate])
+
+    audio_duration = sum(len(audio) for audio in audios) / sampling_rate
+    running_time = sum(transcribe(audio) for audio in audios)
+    return running_time / audio_duration
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    results = {tier: benchmark(tier, sys.argv[1:]) for tier in TIERS}
+
+    print("| Tier | Model | Beam size | VAD filter | Real-time factor |")
+    print("| --- | --- | --- | --- | --- |")
+    for tier, real_time_factor in results.items():
+        defaults = TIERS[tier]
+        print(
+            f"| {tier} | {defaults['model']} | {defaults['beam_size']} "
+            f"| {defaults['vad_filter']} | {real_time_factor:.3f} |"
+        )
+
+    speedup = results["accurate"] / results["fast"]
+    print(f"\nThe fast tier is {speedup:.2f}x faster than the accurate tier.")
+    if speedup <= 1:
+        sys.exit("The fast tier is not faster than the accurate tier.")
@@ -0,0 +1,22 @@
+#!/bin/sh
+# Downloads the files of a Faster Whisper model.
+# Usage: download_model.sh MODEL DIRECTORY
+set -e
+
+MODEL=$1
+DIR=$2
+mkdir -p "$DIR"
+
+# Use Infomaniak-AI repository for turbo model, Systran for others
+if [ "$MODEL" = "turbo" ]; then
+    wget -O "$DIR/config.json" https://huggingface.co/Infomaniak-AI/faster-whisper-large-v3-turbo/resolve/main/config.json
+    wget -O "$DIR/model.bin" https://huggingface.co/Infomaniak-AI/faster-whisper-large-v3-turbo/resolve/main/model.bin
+    wget -O "$DIR/tokenizer.json" https://huggingface.co/Infomaniak-AI/faster-whisper-large-v3-turbo/resolve/main/tokenizer.json
+    wget -O "$DIR/vocabulary.json" https://huggingface.co/Infomaniak-AI/faster-whisper-large-v3-turbo/resolve/main/vocabulary.json
+    wget -O "$DIR/preprocessor_config.json" https://huggingface.co/Infomaniak-AI/faster-whisper-large-v3-turbo/resolve/main/preprocessor_config.json
+else
+    wget -O "$DIR/config.json" "https://huggingface.co/Systran/faster-whisper-${MODEL}/resolve/main/config.json"
+    wget -O "$DIR/model.bin" "https://huggingface.co/Systran/faster-whisper-${MODEL}/resolve/main/model.bin"
+    wget -O "$DIR/tokenizer.json" "https://huggingface.co/Systran/faster-whisper-${MODEL}/resolve/main/tokenizer.json"
+    wget -O "$DIR/vocabulary.txt" "https://huggingface.co/Systran/faster-whisper-${MODEL}/resolve/main/vocabulary.txt"
+fi
@@ -0,0 +1,72 @@
+"""
+Load test for the upload endpoint simulating many slow clients at once.
+
+Usage:
+    python scripts/load_test.py --url http://localhost:3000 --clients 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def upload(host: str, port: int, size: int, chunks: int, delay: float) -> tuple[int, float]:
+    """
+    Uploads `size` bytes to /transcribe in `chunks` parts, waiting `delay` seconds
+    between them. Returns the response status and the request duration.
+    """
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        (
+            f"POST /transcribe HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            f"Content-Type: application/octet-stream\r\n"
+            f"Content-Length: {size}\r\n"
+            f"Connection: close\r\n\r\n"
+        ).encode()
+    )
+    chunk = b"0" * (size // chunks)
+    for i in range(chunks):
+        writer.write(chunk if i < chunks - 1 else b"0" * (size - len(chunk) * (chunks - 1)))
+        await writer.drain()
+        await asyncio.sleep(delay)
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1]), time.perf_counter() - start
+
+
+async def run(url: str, clients: int, size: int, chunks: int, delay: float):
+    parts = urlsplit(url)
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(upload(parts.hostname, parts.port or 80, size, chunks, delay) for _ in range(clients)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    durations = sorted(
+        result[1] for result in results if not isinstance(result, Exception) and result[0] == 201
+    )
+    failures = len(results) - len(durations)
+    print(f"{clients} uploads of {size} bytes in {elapsed:.2f}s, {failures} failed")
+    if durations:
+        p95 = durations[max(int(len(durations) * 0.95) - 1, 0)]
+        print(
+            f"latency median {statistics.median(durations):.2f}s, "
+            f"p95 {p95:.2f}s, max {durations[-1]:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:3000")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--size", type=int, default=1024 * 1024, help="Upload size in bytes")
+    parser.add_argument("--chunks", type=int, default=10, help="Parts to send each upload in")
+    parser.add_argument("--delay", type=float, default=0.1, help="Seconds between parts")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.clients, args.size, args.chunks, args.delay))
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
+
+from src import main
+
+# Body chunks are buffered up to this size before being written to disk
+WRITE_BUFFER_SIZE = int(os.getenv("WRITE_BUFFER_SIZE", 1024 * 1024))
+
+JOB_PATH = re.compile(r"^/job/(?P<job_id>[^/]+)$")
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def send_json(
+    send: Send, data: dict[str, Any], status: int, headers: dict[str, str] | None = None
+):
+    body = json.dumps(data).encode()
+    response_headers = {
+        "content-type": "application/json",
+        "content-length": str(len(body)),
+        # Same policy as the CORS(app) setup of the Flask app
+        "access-control-allow-origin": "*",
+        **{k.lower(): v for k, v in (headers or {}).items()},
+    }
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode(), v.encode()) for k, v in response_headers.items()],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def get_header(scope: Scope, name: str) -> str | None:
+    name_bytes = name.lower().encode()
+    for key, value in scope["headers"]:
+        if key == name_bytes:
+            return value.decode("latin-1")
+    return None
+
+
+async def stream_body(receive: Receive, temp_file: Any) -> int:
+    """
+    Streams the request body to the file without blocking the event loop.
+    Returns the number of bytes written.
+    """
+    size = 0
+    buffer = bytearray()
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnected()
+        chunk = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        size += len(chunk)
+        if size > main.MAX_CONTENT_LENGTH:
+            break
+        buffer += chunk
+        if len(buffer) >= WRITE_BUFFER_SIZE or not more_body:
+            await asyncio.to_thread(temp_file.write, bytes(buffer))
+            buffer.clear()
+    await asyncio.to_thread(temp_file.flush)  # Ensure data is written to disk
+    return size
+
+
+async def transcribe(scope: Scope, receive: Receive, send: Send):
+    """
+    Async version of main.transcribe, see its docstring for the API documentation.
+    """
+    upload = main.Upload(
+        dict(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)),
+        int(get_header(scope, "content-length") or 0),
+        get_header(scope, "x-profile"),
+    )
+    error = await asyncio.to_thread(upload.check)
+    if error:
+        await send_json(send, *error)
+        return
+
+    temp_file = await asyncio.to_thread(upload.open)
+    try:
+        file_size = await stream_body(receive, temp_file)
+        await send_json(send, *await asyncio.to_thread(upload.enqueue, file_size))
+
+    except ClientDisconnected:
+        logger.warning("Client disconnected during upload")
+    except Exception:
+        logger.exception("Error processing transcription")
+        await send_json(send, {"error": "Server error"}, 500)
+    finally:
+        await asyncio.to_thread(upload.close)
+
+
+async def get_job_info(scope: Scope, receive: Receive, send: Send, job_id: str):
+    """
+    Async version of main.get_job_info, see its docstring for the API documentation.
+    """
+    job_info, status_code = await asyncio.to_thread(main.fetch_job_info, job_id)
+    await send_json(send, job_info, status_code)
+
+
+# Every other route, including the Swagger docs and CORS preflights, is served by Flask
+flask_app = WSGIMiddleware(main.app)
+
+
+async def app(scope: Scope, receive: Receive, send: Send):
+    """
+    ASGI application serving the upload and job status endpoints on the event loop,
+    so that slow uploads do not tie up a worker.
+    """
+    if scope["type"] == "http":
+        path, method = scope["path"], scope["method"]
+        if path == "/transcribe" and method == "POST":
+            return await transcribe(scope, receive, send)
+        if method == "GET" and (match := JOB_PATH.match(path)):
+            return await get_job_info(scope, receive, send, match["job_id"])
+    elif scope["type"] == "lifespan":
+        # Nothing to set up, acknowledge the lifespan events for the server
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    await flask_app(scope, receive, send)
+
+
+if main.SENTRY_DSN and main.TESTING == "0":
+    app = SentryAsgiMiddleware(app)
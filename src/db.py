@@ -1,12 +1,18 @@
+import json
 import logging
 import os
 import sqlite3
 from contextlib import contextmanager
 from datetime import datetime
 
-from src.types import Transcription
+from src.options import DEFAULT_MODEL, DEFAULT_TIER, stats_key
+from src.types import Transcription, TranscriptionStats
 
 DB_PATH = os.getenv("DATABASE_PATH", "transcriptions.db")
+# Columns added after the transcriptions table was first created
+ADDED_COLUMNS = {"file_size": "INTEGER", "language": "TEXT", "options": "TEXT"}
+# Weight given to the newest job in the rolling processing statistics
+STATS_SMOOTHING = float(os.getenv("STATS_SMOOTHING", 0.1))
 
 
 logger = logging.getLogger(__name__)
@@ -43,19 +49,64 @@ class Database:
                     filename TEXT,
                     total_duration REAL,
                     running_time REAL,
-                    creation_date DATETIME
+                    creation_date DATETIME,
+                    file_size INTEGER,
+                    language TEXT,
+                    options TEXT
                 )
             """
             )
 
+            # Databases created before the columns were added
+            columns = [row[1] for row in cursor.execute("PRAGMA table_info(transcriptions)")]
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in columns:
+                    cursor.execute(f"ALTER TABLE transcriptions ADD COLUMN {column} {column_type}")
+
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transcription_stats (
+                    key TEXT PRIMARY KEY,
+                    job_count INTEGER NOT NULL,
+                    real_time_factor REAL,
+                    bytes_per_second REAL,
+                    running_time REAL
+                )
+            """
+            )
+
+            # Seed the rolling statistics of each model and tier from the existing
+            # transcriptions, only once. Jobs without options ran the default model.
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO transcription_stats
+                (key, job_count, real_time_factor, bytes_per_second, running_time)
+                SELECT
+                    COALESCE(json_extract(options, '$.model'), :model) || '/' ||
+                    COALESCE(json_extract(options, '$.tier'), :tier) AS stats_key,
+                    COUNT(*),
+                    SUM(running_time) / SUM(total_duration),
+                    SUM(file_size) / SUM(CASE WHEN file_size IS NOT NULL THEN total_duration END),
+                    AVG(running_time)
+                FROM transcriptions
+                WHERE total_duration > 0
+                AND NOT EXISTS (SELECT 1 FROM transcription_stats)
+                GROUP BY stats_key
+            """,
+                {"model": DEFAULT_MODEL, "tier": DEFAULT_TIER},
+            )
+
     def save_transcription(self, transcription: Transcription):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
                 INSERT INTO transcriptions
-                (job_id, transcription, filename, total_duration, running_time, creation_date)
-                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                (
+                    job_id, transcription, filename, total_duration, running_time,
+                    creation_date, file_size, language, options
+                )
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?)
                 """,
                 (
                     transcription.job_id,
@@ -63,9 +114,40 @@ class Database:
                     transcription.filename,
                     transcription.total_duration,
                     transcription.running_time,
+                    transcription.file_size,
+                    transcription.language,
+                    json.dumps(transcription.options) if transcription.options else None,
                 ),
             )
 
+            # Fold the job into the rolling statistics in the same transaction
+            real_time_factor = bytes_per_second = None
+            if transcription.total_duration:
+                real_time_factor = transcription.running_time / transcription.total_duration
+                if transcription.file_size:
+                    bytes_per_second = transcription.file_size / transcription.total_duration
+            key = stats_key(transcription.options)
+            cursor.execute(
+                "INSERT OR IGNORE INTO transcription_stats (key, job_count) VALUES (?, 0)", (key,)
+            )
+            cursor.execute(
+                f"""
+                UPDATE transcription_stats SET
+                    job_count = job_count + 1,
+                    real_time_factor = {_rolling_average("real_time_factor")},
+                    bytes_per_second = {_rolling_average("bytes_per_second")},
+                    running_time = {_rolling_average("running_time")}
+                WHERE key = :key
+                """,
+                {
+                    "key": key,
+                    "alpha": STATS_SMOOTHING,
+                    "real_time_factor": real_time_factor,
+                    "bytes_per_second": bytes_per_second,
+                    "running_time": transcription.running_time,
+                },
+            )
+
     def get_transcription(self, job_id: str) -> Transcription | None:
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -73,7 +155,7 @@ class Database:
                 """
                 SELECT
                     job_id, transcription, filename, total_duration, running_time,
-                    creation_date
+                    creation_date, file_size, language, options
                 FROM transcriptions
                 WHERE job_id = ?
                 """,
@@ -82,9 +164,38 @@ class Database:
             row = cursor.fetchone()
             if row:
                 new_row = list(row)
-                new_row[-1] = datetime.strptime(new_row[-1], "%Y-%m-%d %H:%M:%S")
+                new_row[5] = datetime.strptime(new_row[5], "%Y-%m-%d %H:%M:%S")
+                new_row[8] = json.loads(new_row[8]) if new_row[8] else None
                 return Transcription(*new_row)
             return None
 
+    def get_stats(self, key: str) -> TranscriptionStats:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT job_count, real_time_factor, bytes_per_second, running_time
+                FROM transcription_stats
+                WHERE key = ?
+                """,
+                (key,),
+            )
+            row = cursor.fetchone()
+            if row:
+                return TranscriptionStats(*row)
+            return TranscriptionStats()
+
+
+def _rolling_average(column: str) -> str:
+    """
+    SQL expression updating an exponentially weighted average with a named parameter,
+    keeping the current value when the parameter is NULL.
+    """
+    return (
+        f"CASE WHEN :{column} IS NULL THEN {column} "
+        f"WHEN {column} IS NULL THEN :{column} "
+        f"ELSE {column} + :alpha * (:{column} - {column}) END"
+    )
+
 
 db = Database()
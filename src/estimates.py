@@ -0,0 +1,170 @@
+import logging
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+
+from redis.client import Pipeline
+from rq import Worker
+from rq.job import Job
+
+from src.db import db
+from src.options import stats_key
+from src.queue import get_queue, redis_connection
+from src.types import TranscriptionStats
+
+QUEUE_TIME_KEY_PREFIX = "transcription:queue:"
+
+# Moves the estimate of a started job from the pending reservations to the started
+# total. Once the queue is empty the totals are resynced, so that jobs removed without
+# starting do not skew the estimates forever. The jobs that workers popped but did not
+# release yet are still pending then, and stay out of the started total.
+RELEASE_SCRIPT = """
+local seconds = redis.call('HGET', KEYS[3], ARGV[1])
+if seconds then
+    redis.call('HDEL', KEYS[3], ARGV[1])
+    redis.call('INCRBYFLOAT', KEYS[2], seconds)
+end
+if redis.call('LLEN', KEYS[4]) == 0 then
+    local unreleased = 0
+    local pending = redis.call('HGETALL', KEYS[3])
+    for i = 1, #pending, 2 do
+        local status = redis.call('HGET', ARGV[2] .. pending[i], 'status')
+        if status == 'queued' or status == 'started' then
+            unreleased = unreleased + tonumber(pending[i + 1])
+        else
+            redis.call('HDEL', KEYS[3], pending[i])
+        end
+    end
+    local enqueued = tonumber(redis.call('GET', KEYS[1]) or '0')
+    redis.call('SET', KEYS[2], tostring(enqueued - unreleased))
+end
+"""
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+release_script = redis_connection.register_script(RELEASE_SCRIPT)
+
+
+def queue_time_key(queue_name: str, total: str) -> str:
+    return f"{QUEUE_TIME_KEY_PREFIX}{queue_name}:{total}"
+
+
+def reserve_queue_time(
+    queue_name: str, seconds: float | None, enqueue: Callable[[Pipeline, float], Job]
+) -> Job:
+    """
+    Enqueues a job with enqueue(pipeline, queued_after), where queued_after is the
+    running total of the jobs enqueued before it, and adds the estimated running time
+    of the job to the total in the same transaction as the push. The total never
+    counts a job that is not in the queue yet.
+    """
+    seconds = seconds or 0.0
+    enqueued_key = queue_time_key(queue_name, "enqueued")
+
+    def reserve(pipe: Pipeline) -> Job:
+        queued_after = float(pipe.get(enqueued_key) or 0)
+        # RQ switches the pipeline to MULTI and queues the push of the job
+        job = enqueue(pipe, queued_after)
+        pipe.incrbyfloat(enqueued_key, seconds)
+        pipe.hset(queue_time_key(queue_name, "pending"), job.id, seconds)
+        return job
+
+    # Retried when another upload changed the total in between
+    return redis_connection.transaction(reserve, enqueued_key, value_from_callable=True)
+
+
+def release_queue_time(queue_name: str, job_id: str):
+    """
+    Adds the estimated running time of a job that left the queue to start to the
+    total of the jobs that left the queue.
+    """
+    release_script(
+        keys=[
+            queue_time_key(queue_name, "enqueued"),
+            queue_time_key(queue_name, "started"),
+            queue_time_key(queue_name, "pending"),
+            get_queue(queue_name).key,
+        ],
+        args=[job_id, Job.redis_job_namespace_prefix],
+        client=redis_connection,
+    )
+
+
+def get_job_stats(job: Job) -> TranscriptionStats:
+    """
+    Returns the processing statistics of the model and tier the job runs with.
+    """
+    return db.get_stats(stats_key(job.args[1] if len(job.args) > 1 else None))
+
+
+def estimate_running_time(file_size: int | None, stats: TranscriptionStats) -> float | None:
+    """
+    Estimates how long a job will take to process from the size of its upload and the
+    rolling real-time factor, falling back to the average job running time.
+    """
+    if file_size and stats.bytes_per_second and stats.real_time_factor:
+        return file_size / stats.bytes_per_second * stats.real_time_factor
+    return stats.running_time
+
+
+def estimate_remaining_time(job: Job | None, stats: TranscriptionStats) -> float | None:
+    """
+    Estimates how long a started job still needs to finish.
+    """
+    running_time = estimate_running_time(job.meta.get("file_size") if job else None, stats)
+    if running_time is None or job is None or job.started_at is None:
+        return running_time
+    started_at = job.started_at
+    if started_at.tzinfo is None:
+        started_at = started_at.replace(tzinfo=timezone.utc)
+    elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
+    return max(running_time - elapsed, 0.0)
+
+
+def get_queue_estimate(job: Job) -> dict[str, Any]:
+    """
+    Returns the queue position of a pending job (0 once it has started) and the
+    estimated number of seconds until it finishes, or None when there is no history.
+    """
+    stats = get_job_stats(job)
+
+    if job.is_started:
+        return {"queuePosition": 0, "estimatedSeconds": estimate_remaining_time(job, stats)}
+
+    if not job.is_queued:
+        return {}
+
+    queue = get_queue(job.origin)
+    index = redis_connection.lpos(queue.key, job.id)
+    if index is None:
+        return {}
+    position = index + 1
+
+    # Work queued ahead of the job, from the running totals kept on enqueue and start
+    queued_after = job.meta.get("queued_after")
+    started_total = redis_connection.get(queue_time_key(queue.name, "started"))
+    queued_ahead = (
+        max(queued_after - float(started_total or 0), 0.0) if queued_after is not None else None
+    )
+
+    # At most one started job per worker
+    started_ids = queue.started_job_registry.get_job_ids()
+    started_jobs = Job.fetch_many(started_ids, connection=redis_connection)
+
+    estimates = [
+        estimate_remaining_time(started, get_job_stats(started))
+        for started in started_jobs
+        if started
+    ]
+    running_time = estimate_running_time(job.meta.get("file_size"), stats)
+    if running_time is None or queued_ahead is None or None in estimates:
+        return {"queuePosition": position, "estimatedSeconds": None}
+
+    # Work ahead of the job is shared between the workers serving the queue
+    workers = max(Worker.count(queue=queue), 1)
+    return {
+        "queuePosition": position,
+        "estimatedSeconds": (sum(estimates) + queued_ahead) / workers + running_time,
+    }
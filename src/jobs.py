@@ -1,53 +1,100 @@
 import logging
 import os
 import time
+from dataclasses import asdict
 from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any
 
-from faster_whisper import WhisperModel
+from faster_whisper import WhisperModel, decode_audio
 from rq import get_current_job
 
-from src.types import Transcription
+from src.estimates import release_queue_time
+from src.options import DEFAULT_MODEL, DEFAULT_TIER
+from src.profiling import JobProfiler
+from src.types import Transcription, TranscriptionOptions
 
 GPU = os.getenv("GPU", "0").lower() == "1"
+MODELS_PATH = os.getenv("MODELS_PATH", "/app/models")
 
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-def transcribe_task(filename: str) -> Transcription:
+@lru_cache(maxsize=None)
+def load_model(model: str) -> WhisperModel:
+    """
+    Loads a model once per worker process. The default model lives in MODELS_PATH,
+    additional models in a subdirectory named after them.
+    """
+    logger.info(f"Loading model {model}")
+    model_path = MODELS_PATH if model == DEFAULT_MODEL else os.path.join(MODELS_PATH, model)
+    return WhisperModel(
+        model_size_or_path=model_path,
+        local_files_only=True,  # Ensure we use the model from the container
+        device="cuda" if GPU else "cpu",
+        compute_type="float16" if GPU else "float32",
+    )
+
+
+def transcribe_task(filename: str, options: dict[str, Any] | None = None) -> Transcription:
     logger.info(f"Transcribing {filename}")
     job = get_current_job()
 
+    # Jobs enqueued before options were supported use the previous defaults
+    transcription_options = (
+        TranscriptionOptions(**options)
+        if options
+        else TranscriptionOptions(model=DEFAULT_MODEL, language="en", tier=DEFAULT_TIER)
+    )
+
+    # The job left the queue, its estimate no longer counts towards the work queued
+    try:
+        release_queue_time(job.origin, job.id)
+    except Exception as e:
+        logger.error(f"Error releasing the queue time of job {job.id}: {e}")
+
+    profiler = JobProfiler(job.id, enabled=bool(job.meta.get("profile")))
+
     try:
         # Ensure the file exists before attempting to transcribe
         if not os.path.exists(filename):
             raise FileNotFoundError(f"File {filename} does not exist")
+        file_size = os.path.getsize(filename)
 
-        model = WhisperModel(
-            model_size_or_path="/app/models",
-            local_files_only=True,  # Ensure we use the model from the container
-            device="cuda" if GPU else "cpu",
-            compute_type="float16" if GPU else "float32",
-        )
+        with profiler:
+            with profiler.stage("load_model"):
+                model = load_model(transcription_options.model)
+
+            # Initialize variables for the concatenated transcription durations
+            transcription_text = ""
+            total_duration = 0.0
+            start_time = time.time()
 
-        # Initialize variables for the concatenated transcription durations
-        transcription_text = ""
-        total_duration = 0.0
-        start_time = time.time()
+            with profiler.stage("decode"):
+                audio = decode_audio(filename, sampling_rate=model.feature_extractor.sampling_rate)
 
-        segments, info = model.transcribe(filename, beam_size=5, language="en")
+            # Feature extraction (and language detection) happen eagerly, segments are lazy
+            with profiler.stage("feature_extraction"):
+                segments, info = model.transcribe(
+                    audio,
+                    beam_size=transcription_options.beam_size,
+                    language=transcription_options.language,
+                    vad_filter=transcription_options.vad_filter,
+                )
 
-        # Loop through segments to build the full transcription and calculate total duration
-        for segment in segments:
-            transcription_text += segment.text.strip() + " "
-            total_duration = max(total_duration, segment.end)
+            # Loop through segments to build the full transcription and calculate total duration
+            with profiler.stage("generate"):
+                for segment in segments:
+                    transcription_text += segment.text.strip() + " "
+                    total_duration = max(total_duration, segment.end)
 
-        # Strip trailing whitespace from the concatenated transcription
-        transcription_text = transcription_text.strip()
+            # Strip trailing whitespace from the concatenated transcription
+            transcription_text = transcription_text.strip()
 
-        end_time = time.time()
-        running_time = end_time - start_time  # Calculate job running time in seconds
+            end_time = time.time()
+            running_time = end_time - start_time  # Calculate job running time in seconds
 
         return Transcription(
             job_id=job.id,
@@ -56,6 +103,9 @@ def transcribe_task(filename: str) -> Transcription:
             total_duration=total_duration,
             running_time=running_time,
             creation_date=datetime.now(timezone.utc),
+            file_size=file_size,
+            language=info.language,
+            options=asdict(transcription_options),
         )
 
     except FileNotFoundError as e:
@@ -1,7 +1,11 @@
 import logging
 import os
+import random
 import tempfile
-from typing import Any
+from collections.abc import Mapping
+from dataclasses import asdict
+from typing import IO, Any
+from uuid import uuid4
 
 import sentry_sdk
 from flasgger import Swagger
@@ -12,21 +16,30 @@ from sentry_sdk.integrations.rq import RqIntegration
 
 from src import callbacks
 from src.db import db
+from src.estimates import estimate_running_time, get_queue_estimate, reserve_queue_time
 from src.jobs import transcribe_task
-from src.queue import rq_queue
+from src.options import parse_options, queue_name, stats_key
+from src.profiling import get_profile
+from src.queue import fetch_job, get_queue
+from src.spool import RETRY_AFTER, UPLOADS_PATH, check_capacity, upload_prefix
+from redis.client import Pipeline
+from rq import Worker
 from rq.job import Job
-from src.types import Transcription
+from src.types import Transcription, TranscriptionOptions
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Config
-UPLOADS_PATH = os.getenv("UPLOADS_PATH", "./uploads")
 TESTING = os.getenv("TESTING", "0")
 SENTRY_DSN = os.environ.get("SENTRY_DSN")
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "dev")
 MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", 250 * 1024 * 1024))
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+
+# Response data, HTTP status code and headers shared by the Flask and ASGI views
+Response = tuple[dict[str, Any], int, dict[str, str]]
 
 # Sentry initialization
 if SENTRY_DSN and TESTING == "0":
@@ -48,6 +61,206 @@ CORS(app)  # , origins=["http://localhost:58751", "https://dc.coord.dev"])
 swagger = Swagger(app)
 
 
+def should_profile(profile_header: str | None) -> bool:
+    """
+    Decides whether the job for a request should run under the profiler,
+    either because the client asked for it or because it was sampled.
+    """
+    if profile_header == "1":
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def delete_file(filename: str):
+    """
+    Deletes an uploaded file that was never handed over to a job.
+    """
+    try:
+        if os.path.exists(filename):
+            os.remove(filename)
+    except Exception as e:
+        logger.error(f"Error deleting temporary file {filename}: {e}")
+
+
+def enqueue_transcription(
+    filename: str,
+    file_size: int,
+    profile: bool,
+    options: TranscriptionOptions,
+    job_id: str | None = None,
+) -> Job:
+    """
+    Enqueues the transcription task for an uploaded file on the queue of the
+    workers serving the requested model.
+    """
+    queue = get_queue(queue_name(options.model))
+
+    estimated_seconds = estimate_running_time(file_size, db.get_stats(stats_key(asdict(options))))
+
+    def enqueue(pipeline: Pipeline, queued_after: float) -> Job:
+        return queue.enqueue(
+            transcribe_task,
+            args=(filename, asdict(options)),
+            result_ttl=3600 * 24 * 7,
+            job_timeout=3600 * 4,
+            on_success=callbacks.transcription_completed,
+            on_failure=callbacks.transcription_failed,
+            meta={"profile": profile, "file_size": file_size, "queued_after": queued_after},
+            job_id=job_id,
+            pipeline=pipeline,
+        )
+
+    # Reserve the estimate in the queue total so that polls need not sum the jobs ahead
+    job = reserve_queue_time(queue.name, estimated_seconds, enqueue)
+    logger.info(
+        f"Enqueued transcription job {job.get_id()} for file {filename} on queue {queue.name}"
+    )
+    return job
+
+
+class Upload:
+    """
+    Steps of a /transcribe request shared by the Flask and ASGI views, which only
+    read the body into the file and format the responses.
+    """
+
+    def __init__(
+        self, params: Mapping[str, str], content_length: int | None, profile_header: str | None
+    ):
+        self.params = params
+        self.content_length = content_length or 0
+        self.profile_header = profile_header
+        self.options: TranscriptionOptions | None = None
+        self.file: IO[bytes] | None = None
+        self.job_id = str(uuid4())
+        self.job: Job | None = None
+
+    def check(self) -> Response | None:
+        """
+        Validates the options and rejects the upload before its body is read if there
+        is no capacity left. Returns the error response, or None to accept the upload.
+        """
+        try:
+            self.options = parse_options(self.params)
+        except ValueError as e:
+            return {"error": str(e)}, 400, {}
+
+        if self.content_length > MAX_CONTENT_LENGTH:
+            return {"error": "File too large."}, 413, {}
+
+        try:
+            # Extra models are only served by the workers started for them. Uploads for
+            # the default model wait in the queue while its workers start or restart.
+            name = queue_name(self.options.model)
+            if name != "default" and not Worker.count(queue=get_queue(name)):
+                reason = f"No worker is serving model {self.options.model}."
+            else:
+                reason = check_capacity(self.content_length)
+        except Exception:
+            logger.exception("Error checking transcription capacity")
+            return {"error": "Server error"}, 500, {}
+        if reason:
+            logger.warning(f"Rejecting transcription upload: {reason}")
+            return {"error": reason}, 503, {"Retry-After": str(RETRY_AFTER)}
+        return None
+
+    def open(self) -> IO[bytes]:
+        """
+        Creates the file the body is written to, named after the job that will
+        transcribe it so that the spool sweep can tell whether the job still needs it.
+        """
+        # Ensure the uploads directory exists
+        os.makedirs(UPLOADS_PATH, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(
+            dir=UPLOADS_PATH, prefix=upload_prefix(self.job_id), delete=False
+        )
+        return self.file
+
+    def enqueue(self, file_size: int) -> Response:
+        """
+        Enqueues the transcription of the written file.
+        """
+        if not file_size:
+            return {"error": "No file uploaded or invalid file format."}, 400, {}
+        if file_size > MAX_CONTENT_LENGTH:
+            return {"error": "File too large."}, 413, {}
+
+        self.file.flush()  # Ensure data is written to disk
+        self.job = enqueue_transcription(
+            self.file.name,
+            file_size,
+            should_profile(self.profile_header),
+            self.options,
+            job_id=self.job_id,
+        )
+        return {"jobId": self.job.get_id()}, 201, {}
+
+    def close(self):
+        """
+        Closes the file, deleting it if no job owns it since no callback will.
+        """
+        if self.file is None:
+            return
+        self.file.close()
+        if self.job is None:
+            delete_file(self.file.name)
+
+
+def fetch_job_info(job_id: str) -> tuple[dict[str, Any], int]:
+    """
+    Looks up a job in the database, then in RQ.
+    Returns the response data and the HTTP status code.
+    """
+    try:
+        # Attempt to fetch the transcription record from the database
+        transcription: Transcription | None = db.get_transcription(job_id)
+        if transcription:
+            # Construct the response data from the transcription record
+            job_info: dict[str, Any] = {
+                "jobId": transcription.job_id,
+                "status": "finished",
+                "transcription": transcription.transcription,
+                "totalDuration": transcription.total_duration,
+                "runningTime": transcription.running_time,
+                "creationDate": transcription.creation_date.isoformat(),
+                "language": transcription.language,
+                "options": transcription.options,
+            }
+            return job_info, 200
+
+        # If transcription not found in DB, check the RQ job status
+        job: Job | None = fetch_job(job_id)
+        if job:
+            # Map RQ job statuses to desired status messages
+            if job.is_failed:
+                status = "failure"
+            elif job.is_finished:
+                # Job is finished but no DB record exists
+                # TODO: Handle this case
+                status = "finished"
+            elif job.is_queued or job.is_started or job.is_deferred:
+                status = "processing"
+            else:
+                status = "unknown"
+
+            job_info = {"jobId": job_id, "status": status}
+            if status == "processing":
+                try:
+                    job_info.update(get_queue_estimate(job))
+                except Exception:
+                    # The estimate is best effort, the status is still useful without it
+                    logger.exception(f"Error estimating queue position for job_id {job_id}")
+
+            return job_info, 200
+
+        # If job not found in RQ, return 404
+        return {"error": f"Job ID {job_id} not found."}, 404
+
+    except Exception:
+        logger.exception(f"Error fetching job info for job_id {job_id}")
+        return {"error": "Server error"}, 500
+
+
 @app.route("/transcribe", methods=["POST"])
 def transcribe() -> Any:
     """
@@ -63,6 +276,37 @@ def transcribe() -> Any:
           type: string
           format: binary
         description: The audio file to transcribe.
+      - in: header
+        name: X-Profile
+        type: string
+        required: false
+        description: Set to 1 to profile the transcription job.
+      - in: query
+        name: tier
+        type: string
+        enum: [accurate, fast]
+        default: accurate
+        description: >
+          Speed tier providing the defaults of the other options. The fast tier uses
+          greedy decoding and skips silences.
+      - in: query
+        name: model
+        type: string
+        description: Model to transcribe with, one of the models enabled on the server.
+      - in: query
+        name: language
+        type: string
+        default: en
+        description: Language code of the audio, or auto to detect it.
+      - in: query
+        name: beam_size
+        type: integer
+        minimum: 1
+        description: Beam size, 1 for greedy decoding.
+      - in: query
+        name: vad_filter
+        type: boolean
+        description: Skip the parts of the audio without speech.
     responses:
       201:
         description: Transcription job created successfully.
@@ -73,7 +317,14 @@ def transcribe() -> Any:
               type: string
               description: The unique identifier for the transcription job.
       400:
-        description: No file uploaded or invalid file format.
+        description: No file uploaded, invalid file format or invalid options.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+      413:
+        description: The file is larger than MAX_CONTENT_LENGTH.
         schema:
           type: object
           properties:
@@ -86,42 +337,36 @@ def transcribe() -> Any:
           properties:
             error:
               type: string
+      503:
+        description: >
+          No worker serves the requested extra model, or the queue or upload storage
+          is full. Retry after the number of seconds in the Retry-After header.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
     """
-    # Ensure the uploads directory exists
-    os.makedirs(UPLOADS_PATH, exist_ok=True)
-
-    tempFile = tempfile.NamedTemporaryFile(dir=UPLOADS_PATH, delete=False)
-
-    # Get the file from the request body and save it to a temporary file
-    file = request.data
+    upload = Upload(request.args, request.content_length, request.headers.get("X-Profile"))
+    error = upload.check()
+    if error:
+        data, status_code, headers = error
+        return jsonify(data), status_code, headers
 
+    file = upload.open()
     try:
-        if not file or not isinstance(file, bytes):
-            return jsonify({"error": "No file uploaded or invalid file format."}), 400
-
-        tempFile.write(file)
-        tempFile.flush()  # Ensure data is written to disk
-        filename = tempFile.name
-
-        # Enqueue the transcription task
-        job = rq_queue.enqueue(
-            transcribe_task,
-            args=(filename,),
-            result_ttl=3600 * 24 * 7,
-            job_timeout=3600 * 4,
-            on_success=callbacks.transcription_completed,
-            on_failure=callbacks.transcription_failed,
-        )
-
-        logger.info(f"Enqueued transcription job {job.get_id()} for file {filename}")
-
-        return jsonify({"jobId": job.get_id()}), 201
+        # Get the file from the request body and save it to the file
+        data = request.data
+        if data:
+            file.write(data)
+        data, status_code, headers = upload.enqueue(len(data))
+        return jsonify(data), status_code, headers
 
     except Exception:
         logger.exception("Error processing transcription")
         return jsonify({"error": "Server error"}), 500
     finally:
-        tempFile.close()
+        upload.close()
 
 
 @app.route("/job/<job_id>", methods=["GET"])
@@ -155,10 +400,26 @@ def get_job_info(job_id: str) -> Any:
             creationDate:
               type: string
               format: date-time
+            language:
+              type: string
+              nullable: true
+              description: Language of the audio, detected or requested.
+            options:
+              type: object
+              nullable: true
+              description: Options the job was transcribed with.
             status:
               type: string
               enum: [finished, processing, failure, unknown]
               description: The current status of the transcription job.
+            queuePosition:
+              type: integer
+              description: Jobs ahead of this one plus one while queued, 0 once started.
+            estimatedSeconds:
+              type: number
+              format: float
+              nullable: true
+              description: Estimated seconds until the job finishes.
       404:
         description: Job ID not found.
         schema:
@@ -174,43 +435,66 @@ def get_job_info(job_id: str) -> Any:
             error:
               type: string
     """
-    try:
-        # Attempt to fetch the transcription record from the database
-        transcription: Transcription | None = db.get_transcription(job_id)
-        if transcription:
-            # Construct the response data from the transcription record
-            job_info: dict[str, Any] = {
-                "jobId": transcription.job_id,
-                "status": "finished",
-                "transcription": transcription.transcription,
-                "totalDuration": transcription.total_duration,
-                "runningTime": transcription.running_time,
-                "creationDate": transcription.creation_date.isoformat(),
-            }
-            return jsonify(job_info), 200
+    job_info, status_code = fetch_job_info(job_id)
+    return jsonify(job_info), status_code
 
-        # If transcription not found in DB, check the RQ job status
-        job: Job | None = rq_queue.fetch_job(job_id)
-        if job:
-            # Map RQ job statuses to desired status messages
-            if job.is_failed:
-                status = "failure"
-            elif job.is_finished:
-                # Job is finished but no DB record exists
-                # TODO: Handle this case
-                status = "finished"
-            elif job.is_queued or job.is_started or job.is_deferred:
-                status = "processing"
-            else:
-                status = "unknown"
 
-            return jsonify({"jobId": job_id, "status": status}), 200
-
-        # If job not found in RQ, return 404
-        return jsonify({"error": f"Job ID {job_id} not found."}), 404
+@app.route("/job/<job_id>/profile", methods=["GET"])
+def get_job_profile(job_id: str) -> Any:
+    """
+    Endpoint to retrieve the profile captured for a transcription job.
+    ---
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+        description: The unique identifier for the transcription job.
+    responses:
+      200:
+        description: Job profile retrieved successfully.
+        schema:
+          type: object
+          properties:
+            jobId:
+              type: string
+            totalTime:
+              type: number
+              format: float
+            peakMemoryBytes:
+              type: integer
+            stages:
+              type: object
+              additionalProperties:
+                type: number
+                format: float
+              description: Seconds spent in each stage of the job.
+            profile:
+              type: string
+              description: cProfile report sorted by cumulative time.
+      404:
+        description: No profile found for the job ID.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+      500:
+        description: Server error.
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+    """
+    try:
+        profile = get_profile(job_id)
+        if profile is None:
+            return jsonify({"error": f"No profile found for job ID {job_id}."}), 404
+        return jsonify(profile), 200
 
     except Exception:
-        logger.exception(f"Error fetching job info for job_id {job_id}")
+        logger.exception(f"Error fetching profile for job_id {job_id}")
         return jsonify({"error": "Server error"}), 500
 
 
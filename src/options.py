@@ -0,0 +1,100 @@
+import os
+from collections.abc import Mapping
+from typing import Any
+
+from src.types import TranscriptionOptions
+
+# Model baked into /app/models by the Dockerfile, served by the default queue
+DEFAULT_MODEL = os.getenv("MODEL", "turbo")
+FAST_MODEL = os.getenv("FAST_MODEL") or DEFAULT_MODEL
+# Models that can be requested, each one needs workers listening on its queue
+MODELS = list(
+    dict.fromkeys(
+        [DEFAULT_MODEL, FAST_MODEL]
+        + [model.strip() for model in os.getenv("MODELS", "").split(",") if model.strip()]
+    )
+)
+DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "en")
+MAX_BEAM_SIZE = int(os.getenv("MAX_BEAM_SIZE", 10))
+# Language codes supported by the Whisper models
+LANGUAGES = frozenset(
+    (
+        "af am ar as az ba be bg bn bo br bs ca cs cy da de el en es et eu fa fi fo fr gl gu ha "
+        "haw he hi hr ht hu hy id is it ja jw ka kk km kn ko la lb ln lo lt lv mg mi mk ml mn "
+        "mr ms mt my ne nl nn no oc pa pl ps pt ro ru sa sd si sk sl sn so sq sr su sv sw ta te "
+        "tg th tk tl tr tt uk ur uz vi yi yo zh yue"
+    ).split()
+)
+
+# Defaults of each speed tier, explicit options take precedence
+TIERS = {
+    "accurate": {"model": DEFAULT_MODEL, "beam_size": 5, "vad_filter": False},
+    "fast": {"model": FAST_MODEL, "beam_size": 1, "vad_filter": True},
+}
+DEFAULT_TIER = "accurate"
+
+OPTION_NAMES = {"tier", "model", "language", "beam_size", "vad_filter"}
+TRUE_VALUES = {"1", "true", "yes"}
+FALSE_VALUES = {"0", "false", "no"}
+
+
+def parse_options(params: Mapping[str, str]) -> TranscriptionOptions:
+    """
+    Builds the transcription options from the request parameters, validating them
+    against the allowlists. Raises a ValueError describing the first invalid option.
+    """
+    unknown = sorted(set(params) - OPTION_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown option: {unknown[0]}.")
+
+    tier = params.get("tier", DEFAULT_TIER)
+    if tier not in TIERS:
+        raise ValueError(f"Invalid tier, expected one of: {', '.join(TIERS)}.")
+    defaults = TIERS[tier]
+
+    model = params.get("model", defaults["model"])
+    if model not in MODELS:
+        raise ValueError(f"Invalid model, expected one of: {', '.join(MODELS)}.")
+
+    language: str | None = params.get("language", DEFAULT_LANGUAGE)
+    if language == "auto":
+        language = None
+    elif language not in LANGUAGES:
+        raise ValueError("Invalid language, expected a language code or auto.")
+    elif model.endswith(".en") and language != "en":
+        raise ValueError(f"Model {model} only supports English.")
+
+    try:
+        beam_size = int(params.get("beam_size", defaults["beam_size"]))
+    except ValueError:
+        raise ValueError("Invalid beam_size, expected an integer.") from None
+    if not 1 <= beam_size <= MAX_BEAM_SIZE:
+        raise ValueError(f"Invalid beam_size, expected a value from 1 to {MAX_BEAM_SIZE}.")
+
+    vad_filter = params.get("vad_filter", defaults["vad_filter"])
+    if isinstance(vad_filter, str):
+        if vad_filter.lower() not in TRUE_VALUES | FALSE_VALUES:
+            raise ValueError("Invalid vad_filter, expected true or false.")
+        vad_filter = vad_filter.lower() in TRUE_VALUES
+
+    return TranscriptionOptions(
+        model=model, language=language, beam_size=beam_size, vad_filter=vad_filter, tier=tier
+    )
+
+
+def queue_name(model: str) -> str:
+    """
+    Returns the name of the queue served by the workers that preload the model.
+    """
+    if model == DEFAULT_MODEL:
+        return "default"
+    return f"transcribe-{model}"
+
+
+def stats_key(options: dict[str, Any] | None) -> str:
+    """
+    Returns the key of the processing statistics for jobs run with the options,
+    which depend on the model and the speed tier.
+    """
+    options = options or {}
+    return f"{options.get('model') or DEFAULT_MODEL}/{options.get('tier') or DEFAULT_TIER}"
@@ -0,0 +1,103 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any
+
+from src.queue import redis_connection
+
+PROFILE_TTL = int(os.getenv("PROFILE_TTL", 3600 * 24 * 7))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", 40))
+PROFILE_KEY_PREFIX = "transcription:profile:"
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+class JobProfiler:
+    """
+    Collects a cProfile report, the tracemalloc peak and per-stage timings for a
+    single transcription job. When disabled every method is a no-op so that
+    unprofiled jobs do not pay for the instrumentation.
+    """
+
+    def __init__(self, job_id: str, enabled: bool = False):
+        self.job_id = job_id
+        self.enabled = enabled
+        self.stages: dict[str, float] = {}
+        self._profile: cProfile.Profile | None = None
+        self._started_at = 0.0
+        self._total_time = 0.0
+        self._peak_memory = 0
+
+    def __enter__(self) -> "JobProfiler":
+        if self.enabled:
+            tracemalloc.start()
+            self._profile = cProfile.Profile()
+            self._started_at = time.perf_counter()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if not self.enabled or self._profile is None:
+            return
+        self._profile.disable()
+        self._total_time = time.perf_counter() - self._started_at
+        _, self._peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        try:
+            save_profile(self.job_id, self.artifact())
+        except Exception as e:
+            logger.error(f"Error saving profile for job {self.job_id}: {e}")
+
+    def stage(self, name: str):
+        """
+        Returns a context manager timing the named stage of the job.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._timed_stage(name)
+
+    @contextmanager
+    def _timed_stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def artifact(self) -> dict[str, Any]:
+        """
+        Builds the compact, JSON serialisable profile for the job.
+        """
+        stats_output = io.StringIO()
+        if self._profile is not None:
+            stats = pstats.Stats(self._profile, stream=stats_output)
+            stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE)
+            stats.print_stats(PROFILE_TOP_FUNCTIONS)
+
+        return {
+            "jobId": self.job_id,
+            "totalTime": self._total_time,
+            "peakMemoryBytes": self._peak_memory,
+            "stages": self.stages,
+            "profile": stats_output.getvalue(),
+        }
+
+
+def save_profile(job_id: str, artifact: dict[str, Any]):
+    redis_connection.set(PROFILE_KEY_PREFIX + job_id, json.dumps(artifact), ex=PROFILE_TTL)
+    logger.info(f"Saved profile for job {job_id}")
+
+
+def get_profile(job_id: str) -> dict[str, Any] | None:
+    data = redis_connection.get(PROFILE_KEY_PREFIX + job_id)
+    if data is None:
+        return None
+    return json.loads(data)
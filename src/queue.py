@@ -2,8 +2,35 @@ import os
 
 import redis
 from rq import Queue
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
 
 
 redis_url = os.getenv("REDIS_URL", "redis://coord_transcription_redis:6379")
 redis_connection = redis.from_url(redis_url)
 rq_queue = Queue(connection=redis_connection)
+
+
+def get_queue(name: str) -> Queue:
+    if name == rq_queue.name:
+        return rq_queue
+    return Queue(name, connection=redis_connection)
+
+
+def get_queues() -> list[Queue]:
+    """
+    Returns the default queue and every other queue known to Redis.
+    """
+    return [rq_queue] + [
+        queue for queue in Queue.all(connection=redis_connection) if queue.name != rq_queue.name
+    ]
+
+
+def fetch_job(job_id: str) -> Job | None:
+    """
+    Fetches a job regardless of the queue it was enqueued in.
+    """
+    try:
+        return Job.fetch(job_id, connection=redis_connection)
+    except NoSuchJobError:
+        return None
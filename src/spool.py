@@ -0,0 +1,177 @@
+import logging
+import os
+import shutil
+import time
+from uuid import UUID
+
+from rq.job import Job, JobStatus
+
+from src.queue import get_queues, redis_connection
+
+UPLOADS_PATH = os.getenv("UPLOADS_PATH", "./uploads")
+DELETE_UPLOADED_FILES = os.getenv("DELETE_UPLOADED_FILES", "1") == "1"
+# Admission limits for new uploads, 0 disables the limit
+MAX_SPOOL_SIZE = int(os.getenv("MAX_SPOOL_SIZE", 0))
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", 0))
+MIN_FREE_SPACE = int(os.getenv("MIN_FREE_SPACE", 0))
+RETRY_AFTER = int(os.getenv("RETRY_AFTER", 60))
+# Files younger than this may still be between the upload write and the enqueue
+SPOOL_GRACE_PERIOD = int(os.getenv("SPOOL_GRACE_PERIOD", 600))
+SPOOL_SWEEP_INTERVAL = int(os.getenv("SPOOL_SWEEP_INTERVAL", 300))
+# Jobs in these states no longer need their upload
+DONE_STATUSES = {JobStatus.FINISHED, JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED}
+
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def spool_files() -> list[os.DirEntry]:
+    try:
+        with os.scandir(UPLOADS_PATH) as entries:
+            return [entry for entry in entries if entry.is_file(follow_symlinks=False)]
+    except FileNotFoundError:
+        return []
+
+
+def spool_size() -> int:
+    """
+    Returns the total size in bytes of the files waiting in the uploads directory.
+    """
+    size = 0
+    for entry in spool_files():
+        try:
+            size += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            # Deleted by a job callback while scanning
+            pass
+    return size
+
+
+def check_capacity(incoming_bytes: int) -> str | None:
+    """
+    Checks whether an upload of the given size can be accepted.
+    Returns the reason it has to be rejected, or None if there is capacity for it.
+    """
+    if MAX_QUEUE_DEPTH and sum(queue.count for queue in get_queues()) >= MAX_QUEUE_DEPTH:
+        return "Transcription queue is full."
+    if MAX_SPOOL_SIZE and spool_size() + incoming_bytes > MAX_SPOOL_SIZE:
+        return "Upload storage is full."
+    if MIN_FREE_SPACE:
+        os.makedirs(UPLOADS_PATH, exist_ok=True)
+        if shutil.disk_usage(UPLOADS_PATH).free - incoming_bytes < MIN_FREE_SPACE:
+            return "Not enough disk space for the upload."
+    return None
+
+
+def upload_prefix(job_id: str) -> str:
+    """
+    Returns the prefix of the upload filename for the job that will transcribe it.
+    """
+    return f"{job_id}_"
+
+
+def upload_job_id(path: str) -> str | None:
+    """
+    Returns the id of the job an upload was created for, or None for uploads
+    spooled before the filenames carried the job id.
+    """
+    prefix, separator, _ = os.path.basename(path).partition("_")
+    if not separator:
+        return None
+    try:
+        return str(UUID(prefix))
+    except ValueError:
+        return None
+
+
+def live_job_files() -> set[str]:
+    """
+    Returns the absolute paths of the files still referenced by pending RQ jobs.
+    Only needed for the uploads without the job id in their filename.
+    """
+    job_ids = set()
+    for queue in get_queues():
+        job_ids.update(queue.get_job_ids())
+        for registry in (
+            queue.started_job_registry,
+            queue.deferred_job_registry,
+            queue.scheduled_job_registry,
+        ):
+            job_ids.update(registry.get_job_ids())
+
+    files = set()
+    for job in Job.fetch_many(list(job_ids), connection=redis_connection):
+        if job and job.args:
+            files.add(os.path.abspath(job.args[0]))
+    return files
+
+
+def sweep_orphans() -> list[str]:
+    """
+    Deletes the uploaded files whose job is missing or done, e.g. when a worker was
+    killed, Redis was flushed or the enqueue failed.
+    Returns the paths of the deleted files.
+    """
+    if not DELETE_UPLOADED_FILES:
+        logger.info("DELETE_UPLOADED_FILES is disabled. Skipping spool sweep.")
+        return []
+
+    # List the files before the jobs so that a job enqueued in between is not missed
+    cutoff = time.time() - SPOOL_GRACE_PERIOD
+    candidates = []
+    for entry in spool_files():
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                candidates.append(os.path.abspath(entry.path))
+        except FileNotFoundError:
+            pass
+
+    if not candidates:
+        return []
+
+    # The job is created with the id in the filename, so its status is known even
+    # while a worker has popped it from the queue but not registered it as started
+    job_ids = {path: upload_job_id(path) for path in candidates}
+    ids = sorted({job_id for job_id in job_ids.values() if job_id})
+    jobs = dict(zip(ids, Job.fetch_many(ids, connection=redis_connection)))
+    live_files = live_job_files() if None in job_ids.values() else set()
+
+    deleted = []
+    for path in candidates:
+        job_id = job_ids[path]
+        if job_id is None:
+            if path in live_files:
+                continue
+        else:
+            job = jobs[job_id]
+            if job is not None and job.get_status(refresh=False) not in DONE_STATUSES:
+                continue
+        try:
+            os.remove(path)
+            deleted.append(path)
+            logger.info(f"Deleted orphaned upload: {path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error deleting orphaned upload {path}: {e}")
+    return deleted
+
+
+def run_janitor():
+    """
+    Sweeps the uploads directory for orphaned files every SPOOL_SWEEP_INTERVAL seconds.
+    """
+    logger.info(f"Sweeping {UPLOADS_PATH} every {SPOOL_SWEEP_INTERVAL} seconds")
+    while True:
+        try:
+            deleted = sweep_orphans()
+            if deleted:
+                logger.info(f"Deleted {len(deleted)} orphaned uploads")
+        except Exception:
+            logger.exception("Error sweeping the uploads directory")
+        time.sleep(SPOOL_SWEEP_INTERVAL)
+
+
+if __name__ == "__main__":
+    run_janitor()
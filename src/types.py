@@ -1,5 +1,6 @@
 from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Any
 
 
 # Type for transcriptions in the database
@@ -11,3 +12,25 @@ class Transcription:
     total_duration: float | None = None
     running_time: float = 0.0
     creation_date: datetime = field(default_factory=datetime.utcnow)
+    file_size: int | None = None
+    language: str | None = None  # Language of the audio, detected or requested
+    options: dict[str, Any] | None = None  # TranscriptionOptions the job ran with
+
+
+# Decoding options requested for a transcription job
+@dataclass
+class TranscriptionOptions:
+    model: str
+    language: str | None = None  # None to detect the language
+    beam_size: int = 5  # 1 for greedy decoding
+    vad_filter: bool = False  # Skip the silent parts of the audio
+    tier: str | None = None
+
+
+# Rolling processing statistics learned from finished transcriptions
+@dataclass
+class TranscriptionStats:
+    job_count: int = 0
+    real_time_factor: float | None = None  # running_time / total_duration
+    bytes_per_second: float | None = None  # file_size / total_duration
+    running_time: float | None = None  # Average job running time in seconds
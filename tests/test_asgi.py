@@ -0,0 +1,189 @@
+# tests/test_asgi.py
+
+import asyncio
+import json
+import os
+
+import pytest
+from src.asgi import app
+
+
+def call(method, path, chunks=(), headers=None, query_string=b""):
+    """
+    Sends a request to the ASGI app and returns the status, headers and JSON body.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ] or [{"type": "http.request", "body": b"", "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+
+    start = sent[0]
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    response_headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return start["status"], response_headers, json.loads(body)
+
+
+@pytest.fixture
+def uploads(tmp_path, mocker):
+    mocker.patch("src.main.UPLOADS_PATH", str(tmp_path))
+    mocker.patch("src.main.check_capacity", return_value=None)
+    mocker.patch("src.main.Worker").count.return_value = 1
+    return tmp_path
+
+
+def test_transcribe_streams_upload(uploads, mocker):
+    mock_enqueue = mocker.patch("src.main.enqueue_transcription")
+    mock_enqueue.return_value.get_id.return_value = "12345"
+
+    status, headers, data = call(
+        "POST", "/transcribe", chunks=[b"test audio ", b"data"], headers={"X-Profile": "1"}
+    )
+
+    assert status == 201
+    assert data == {"jobId": "12345"}
+    assert headers["access-control-allow-origin"] == "*"
+
+    filename, file_size, profile, options = mock_enqueue.call_args[0]
+    assert file_size == len(b"test audio data")
+    assert profile is True
+    assert options.tier == "accurate"
+    with open(filename, "rb") as f:
+        assert f.read() == b"test audio data"
+
+
+def test_transcribe_options(uploads, mocker):
+    mock_enqueue = mocker.patch("src.main.enqueue_transcription")
+    mock_enqueue.return_value.get_id.return_value = "12345"
+
+    status, _, _ = call(
+        "POST",
+        "/transcribe",
+        chunks=[b"test audio data"],
+        query_string=b"tier=fast&language=auto",
+    )
+
+    assert status == 201
+    options = mock_enqueue.call_args[0][3]
+    assert options.tier == "fast"
+    assert options.language is None
+    assert options.beam_size == 1
+    assert options.vad_filter is True
+
+
+def test_transcribe_invalid_options(uploads, mocker):
+    mock_enqueue = mocker.patch("src.main.enqueue_transcription")
+
+    status, _, data = call(
+        "POST", "/transcribe", chunks=[b"test audio data"], query_string=b"beam_size=0"
+    )
+
+    assert status == 400
+    assert data["error"] == "Invalid beam_size, expected a value from 1 to 10."
+    mock_enqueue.assert_not_called()
+    assert os.listdir(uploads) == []
+
+
+def test_transcribe_blank_option(uploads, mocker):
+    mock_enqueue = mocker.patch("src.main.enqueue_transcription")
+
+    # Same as the Flask view, a blank value is invalid rather than ignored
+    status, _, data = call(
+        "POST", "/transcribe", chunks=[b"test audio data"], query_string=b"language="
+    )
+
+    assert status == 400
+    assert data["error"] == "Invalid language, expected a language code or auto."
+    mock_enqueue.assert_not_called()
+
+
+def test_transcribe_no_data(uploads, mocker):
+    mock_enqueue = mocker.patch("src.main.enqueue_transcription")
+
+    status, _, data = call("POST", "/transcribe")
+
+    assert status == 400
+    assert data["error"] == "No file uploaded or invalid file format."
+    mock_enqueue.assert_not_called()
+    assert os.listdir(uploads) == []
+
+
+def test_transcribe_enqueue_failure(uploads, mocker):
+    mocker.patch("src.main.enqueue_transcription", side_effect=Exception("Enqueue failed"))
+
+    status, _, data = call("POST", "/transcribe", chunks=[b"test audio data"])
+
+    assert status == 500
+    assert data["error"] == "Server error"
+    assert os.listdir(uploads) == []
+
+
+def test_transcribe_too_large(uploads, mocker):
+    mocker.patch("src.main.MAX_CONTENT_LENGTH", 10)
+    mock_enqueue = mocker.patch("src.main.enqueue_transcription")
+
+    status, _, _ = call("POST", "/transcribe", chunks=[b"test audio ", b"data"])
+
+    assert status == 413
+    mock_enqueue.assert_not_called()
+    assert os.listdir(uploads) == []
+
+
+def test_transcribe_over_capacity(uploads, mocker):
+    mocker.patch("src.main.check_capacity", return_value="Upload storage is full.")
+
+    status, headers, data = call(
+        "POST", "/transcribe", chunks=[b"test audio data"], headers={"Content-Length": "15"}
+    )
+
+    assert status == 503
+    assert data["error"] == "Upload storage is full."
+    assert headers["retry-after"] == "60"
+
+
+def test_get_job_info(mocker):
+    mock_fetch_job_info = mocker.patch("src.main.fetch_job_info")
+    mock_fetch_job_info.return_value = ({"jobId": "12345", "status": "processing"}, 200)
+
+    status, _, data = call("GET", "/job/12345")
+
+    assert status == 200
+    assert data == {"jobId": "12345", "status": "processing"}
+    mock_fetch_job_info.assert_called_once_with("12345")
+
+
+def test_other_routes_served_by_flask(mocker):
+    mock_get_profile = mocker.patch("src.main.get_profile", return_value=None)
+
+    status, _, data = call("GET", "/job/12345/profile")
+
+    assert status == 404
+    assert data["error"] == "No profile found for job ID 12345."
+    mock_get_profile.assert_called_once_with("12345")
+
+    status, _, spec = call("GET", "/apispec_1.json")
+
+    assert status == 200
+    assert {"/transcribe", "/job/{job_id}"} <= set(spec["paths"])
@@ -0,0 +1,164 @@
+# tests/test_db.py
+
+import sqlite3
+
+import pytest
+from src.db import Database
+from src.options import DEFAULT_MODEL
+from src.types import Transcription, TranscriptionStats
+
+
+# Schema of the transcriptions table before any column was added
+BASELINE_SCHEMA = """
+    CREATE TABLE transcriptions (
+        job_id TEXT PRIMARY KEY,
+        transcription TEXT,
+        filename TEXT,
+        total_duration REAL,
+        running_time REAL,
+        creation_date DATETIME
+    )
+"""
+
+# Statistics of the jobs run without options or with the accurate tier defaults
+DEFAULT_KEY = f"{DEFAULT_MODEL}/accurate"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "t.db")
+
+
+def create_baseline_db(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.execute(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO transcriptions VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)", rows)
+    conn.commit()
+    conn.close()
+
+
+def make_transcription(
+    job_id, total_duration=100.0, running_time=10.0, file_size=None, tier="accurate"
+):
+    return Transcription(
+        job_id=job_id,
+        transcription="Hello world",
+        filename=f"{job_id}.wav",
+        total_duration=total_duration,
+        running_time=running_time,
+        file_size=file_size,
+        language="en",
+        options={"model": DEFAULT_MODEL, "tier": tier},
+    )
+
+
+def test_get_stats_empty(db_path):
+    assert Database(db_path).get_stats(DEFAULT_KEY) == TranscriptionStats()
+
+
+def test_migrates_baseline_table(db_path):
+    create_baseline_db(db_path, [("old", "Old text", "old.wav", 50.0, 5.0)])
+
+    db = Database(db_path)
+
+    conn = sqlite3.connect(db_path)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(transcriptions)")]
+    conn.close()
+    assert columns[-3:] == ["file_size", "language", "options"]
+
+    # Existing rows are kept, with the new columns empty
+    transcription = db.get_transcription("old")
+    assert transcription.transcription == "Old text"
+    assert transcription.total_duration == 50.0
+    assert transcription.file_size is None
+    assert transcription.language is None
+    assert transcription.options is None
+
+    # New rows can be written to the migrated table
+    db.save_transcription(make_transcription("new", file_size=1_000_000))
+    assert db.get_transcription("new").file_size == 1_000_000
+
+
+def test_seeds_stats_from_existing_transcriptions(db_path):
+    create_baseline_db(
+        db_path,
+        [
+            ("a", "", "a.wav", 100.0, 10.0),
+            ("b", "", "b.wav", 300.0, 50.0),
+            # Without a duration the job says nothing about the real-time factor
+            ("c", "", "c.wav", 0.0, 1.0),
+        ],
+    )
+
+    stats = Database(db_path).get_stats(DEFAULT_KEY)
+
+    assert stats.job_count == 2
+    assert stats.real_time_factor == pytest.approx(60.0 / 400.0)
+    assert stats.bytes_per_second is None
+    assert stats.running_time == pytest.approx(30.0)
+
+
+def test_seeds_stats_only_once(db_path):
+    create_baseline_db(db_path, [("a", "", "a.wav", 100.0, 10.0)])
+    Database(db_path)
+
+    # Reopening must not reseed the statistics from the table
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO transcriptions (job_id, total_duration, running_time) "
+        "VALUES ('b', 100.0, 90.0)"
+    )
+    conn.commit()
+    conn.close()
+
+    stats = Database(db_path).get_stats(DEFAULT_KEY)
+
+    assert stats.job_count == 1
+    assert stats.real_time_factor == pytest.approx(0.1)
+
+
+def test_save_transcription_updates_rolling_stats(db_path, mocker):
+    mocker.patch("src.db.STATS_SMOOTHING", 0.5)
+    db = Database(db_path)
+
+    # The first job sets the averages, including the ones that were NULL
+    db.save_transcription(make_transcription("a", running_time=10.0, file_size=1_000_000))
+    stats = db.get_stats(DEFAULT_KEY)
+    assert stats.job_count == 1
+    assert stats.real_time_factor == pytest.approx(0.1)
+    assert stats.bytes_per_second == pytest.approx(10_000.0)
+    assert stats.running_time == pytest.approx(10.0)
+
+    # The next jobs move them halfway
+    db.save_transcription(make_transcription("b", running_time=30.0, file_size=3_000_000))
+    stats = db.get_stats(DEFAULT_KEY)
+    assert stats.job_count == 2
+    assert stats.real_time_factor == pytest.approx(0.2)
+    assert stats.bytes_per_second == pytest.approx(20_000.0)
+    assert stats.running_time == pytest.approx(20.0)
+
+
+def test_save_transcription_keeps_stats_without_values(db_path, mocker):
+    mocker.patch("src.db.STATS_SMOOTHING", 0.5)
+    db = Database(db_path)
+    db.save_transcription(make_transcription("a", running_time=10.0, file_size=1_000_000))
+
+    # Without a duration or size, only the running time can be folded in
+    db.save_transcription(make_transcription("b", total_duration=None, running_time=30.0))
+    stats = db.get_stats(DEFAULT_KEY)
+
+    assert stats.job_count == 2
+    assert stats.real_time_factor == pytest.approx(0.1)
+    assert stats.bytes_per_second == pytest.approx(10_000.0)
+    assert stats.running_time == pytest.approx(20.0)
+
+
+def test_stats_are_kept_per_model_and_tier(db_path):
+    db = Database(db_path)
+
+    db.save_transcription(make_transcription("a", running_time=10.0))
+    db.save_transcription(make_transcription("b", running_time=2.0, tier="fast"))
+
+    assert db.get_stats(DEFAULT_KEY).real_time_factor == pytest.approx(0.1)
+    assert db.get_stats(f"{DEFAULT_MODEL}/fast").real_time_factor == pytest.approx(0.02)
+    assert db.get_stats("other/accurate") == TranscriptionStats()
@@ -0,0 +1,242 @@
+# tests/test_estimates.py
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+import pytest
+from rq import Queue
+from rq.job import Job
+from src.estimates import (
+    estimate_running_time,
+    get_queue_estimate,
+    release_queue_time,
+    reserve_queue_time,
+)
+from src.types import TranscriptionStats
+
+STATS = TranscriptionStats(
+    job_count=10, real_time_factor=0.1, bytes_per_second=1000.0, running_time=50.0
+)
+
+
+def make_job(job_id, file_size=None, queued=True, started_at=None, queued_after=None):
+    job = MagicMock()
+    job.id = job_id
+    job.meta = {"file_size": file_size} if file_size else {}
+    if queued_after is not None:
+        job.meta["queued_after"] = queued_after
+    job.is_queued = queued
+    job.is_started = not queued
+    job.started_at = started_at
+    return job
+
+
+@pytest.fixture
+def mock_queue(mocker):
+    mocker.patch("src.estimates.db").get_stats.return_value = STATS
+    mocker.patch("src.estimates.Worker").count.return_value = 1
+    mock_queue = MagicMock()
+    mock_queue.name = "default"
+    mock_queue.key = "rq:queue:default"
+    mocker.patch("src.estimates.get_queue", return_value=mock_queue)
+    return mock_queue
+
+
+@pytest.fixture
+def mock_redis(mocker):
+    return mocker.patch("src.estimates.redis_connection")
+
+
+def test_estimate_running_time_from_file_size():
+    # 100 seconds of audio at a real-time factor of 0.1
+    assert estimate_running_time(100_000, STATS) == 10.0
+
+
+def test_estimate_running_time_falls_back_to_average():
+    assert estimate_running_time(None, STATS) == 50.0
+    assert estimate_running_time(None, TranscriptionStats()) is None
+
+
+def test_queue_estimate_started_job(mock_queue):
+    started_at = datetime.now(timezone.utc) - timedelta(seconds=4)
+    job = make_job("a", file_size=100_000, queued=False, started_at=started_at)
+
+    estimate = get_queue_estimate(job)
+
+    assert estimate["queuePosition"] == 0
+    assert estimate["estimatedSeconds"] == pytest.approx(6.0, abs=1)
+
+
+def test_queue_estimate_queued_job(mock_queue, mock_redis):
+    running = make_job("a", file_size=100_000, queued=False)
+    running.started_at = datetime.now(timezone.utc)
+    # 120s were enqueued before this job and 100s of them have left the queue
+    job = make_job("c", file_size=300_000, queued_after=120.0)
+    mock_redis.lpos.return_value = 1
+    mock_redis.get.return_value = b"100"
+    mock_queue.started_job_registry.get_job_ids.return_value = ["a"]
+
+    with patch("src.estimates.Job.fetch_many", return_value=[running]) as mock_fetch_many:
+        estimate = get_queue_estimate(job)
+
+    assert estimate["queuePosition"] == 2
+    # ~10s left on the running job, 20s queued ahead and 30s for this one
+    assert estimate["estimatedSeconds"] == pytest.approx(60.0, abs=1)
+    mock_redis.lpos.assert_called_once_with("rq:queue:default", "c")
+    mock_redis.get.assert_called_once_with("transcription:queue:default:started")
+    # Only the started jobs are fetched, not the jobs ahead
+    mock_fetch_many.assert_called_once_with(["a"], connection=mock_redis)
+
+
+def test_queue_estimate_not_in_queue(mock_queue, mock_redis):
+    mock_redis.lpos.return_value = None
+
+    assert get_queue_estimate(make_job("a", file_size=100_000, queued_after=0.0)) == {}
+
+
+def test_queue_estimate_without_history(mock_queue, mock_redis, mocker):
+    mocker.patch("src.estimates.db").get_stats.return_value = TranscriptionStats()
+    job = make_job("a", file_size=100_000, queued_after=0.0)
+    mock_redis.lpos.return_value = 0
+    mock_redis.get.return_value = None
+    mock_queue.started_job_registry.get_job_ids.return_value = []
+
+    with patch("src.estimates.Job.fetch_many", return_value=[]):
+        estimate = get_queue_estimate(job)
+
+    assert estimate == {"queuePosition": 1, "estimatedSeconds": None}
+
+
+def test_queue_estimate_enqueued_before_totals(mock_queue, mock_redis):
+    # Jobs enqueued before the running totals existed have no queued_after
+    job = make_job("a", file_size=100_000)
+    mock_redis.lpos.return_value = 0
+    mock_queue.started_job_registry.get_job_ids.return_value = []
+
+    with patch("src.estimates.Job.fetch_many", return_value=[]):
+        estimate = get_queue_estimate(job)
+
+    assert estimate == {"queuePosition": 1, "estimatedSeconds": None}
+
+
+@pytest.fixture
+def fake_redis(mocker):
+    connection = fakeredis.FakeRedis()
+    mocker.patch("src.estimates.redis_connection", connection)
+    mocker.patch(
+        "src.estimates.get_queue", side_effect=lambda name: Queue(name, connection=connection)
+    )
+    mocker.patch("src.estimates.db").get_stats.return_value = STATS
+    mocker.patch("src.estimates.Worker").count.return_value = 1
+    return connection
+
+
+def enqueue(connection, file_size, on_reserve=None):
+    """
+    Enqueues a job the way the upload does, with an estimate of file_size / 10000 seconds.
+    on_reserve runs in the gap between reading the total and pushing the job.
+    """
+
+    def enqueue_job(pipeline, queued_after):
+        if on_reserve:
+            on_reserve()
+        return Queue("default", connection=connection).enqueue(
+            "os.getcwd",
+            meta={"file_size": file_size, "queued_after": queued_after},
+            pipeline=pipeline,
+        )
+
+    job_id = reserve_queue_time("default", estimate_running_time(file_size, STATS), enqueue_job).id
+    return Job.fetch(job_id, connection=connection)
+
+
+def start(connection):
+    """
+    Pops the next job like a worker, then releases it like transcribe_task.
+    """
+    job_id = connection.lpop("rq:queue:default").decode()
+    release_queue_time("default", job_id)
+
+
+def queue_totals(connection):
+    return (
+        float(connection.get("transcription:queue:default:enqueued") or 0),
+        float(connection.get("transcription:queue:default:started") or 0),
+    )
+
+
+def test_reserve_queue_time(fake_redis):
+    first = enqueue(fake_redis, 100_000)
+    second = enqueue(fake_redis, 200_000)
+
+    assert first.meta["queued_after"] == 0.0
+    assert second.meta["queued_after"] == 10.0
+    assert fake_redis.lrange("rq:queue:default", 0, -1) == [first.id.encode(), second.id.encode()]
+    assert queue_totals(fake_redis) == (30.0, 0.0)
+
+
+def test_queue_estimate_with_running_totals(fake_redis):
+    enqueue(fake_redis, 100_000)
+    enqueue(fake_redis, 200_000)
+    job = enqueue(fake_redis, 300_000)
+    start(fake_redis)
+
+    estimate = get_queue_estimate(job)
+
+    # 20s queued ahead and 30s for this one
+    assert estimate == {"queuePosition": 2, "estimatedSeconds": pytest.approx(50.0)}
+
+
+def test_release_while_reserving_on_empty_queue(fake_redis):
+    enqueue(fake_redis, 100_000)
+    job_id = fake_redis.lpop("rq:queue:default").decode()
+
+    # The worker starts the last queued job while the next upload is being enqueued
+    enqueue(fake_redis, 200_000, on_reserve=lambda: release_queue_time("default", job_id))
+    assert queue_totals(fake_redis) == (30.0, 10.0)
+
+    # The job enqueued in the gap is counted once when it starts
+    start(fake_redis)
+    assert queue_totals(fake_redis) == (30.0, 30.0)
+
+    job = enqueue(fake_redis, 300_000)
+    assert get_queue_estimate(job)["estimatedSeconds"] == pytest.approx(30.0)
+
+
+def test_resync_keeps_popped_jobs_pending(fake_redis):
+    enqueue(fake_redis, 100_000)
+    enqueue(fake_redis, 200_000)
+    # A worker popped the first job but did not release it yet
+    popped_id = fake_redis.lpop("rq:queue:default").decode()
+
+    # The queue is empty once the second job starts
+    start(fake_redis)
+    assert queue_totals(fake_redis) == (30.0, 20.0)
+
+    release_queue_time("default", popped_id)
+    assert queue_totals(fake_redis) == (30.0, 30.0)
+
+
+def test_resync_drops_jobs_removed_from_queue(fake_redis):
+    removed = enqueue(fake_redis, 100_000)
+    enqueue(fake_redis, 200_000)
+    # Removed without starting, e.g. by rq empty
+    fake_redis.lrem("rq:queue:default", 0, removed.id)
+    removed.delete()
+
+    start(fake_redis)
+
+    assert queue_totals(fake_redis) == (30.0, 30.0)
+    assert fake_redis.hlen("transcription:queue:default:pending") == 0
+
+
+def test_queue_estimate_uses_stats_of_model_and_tier(mock_queue, mocker):
+    mock_db = mocker.patch("src.estimates.db")
+    mock_db.get_stats.return_value = STATS
+    job = make_job("a", file_size=100_000, queued=False, started_at=datetime.now(timezone.utc))
+    job.args = ("upload.wav", {"model": "small", "tier": "fast"})
+
+    get_queue_estimate(job)
+
+    mock_db.get_stats.assert_called_once_with("small/fast")
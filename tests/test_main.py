@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 from src.main import app
 from src.jobs import transcribe_task
+from src.options import DEFAULT_MODEL
 from src.types import Transcription
 
 
@@ -23,14 +24,31 @@ def mock_database(mocker):
     return mock_db
 
 
-# Fixture to mock RQ queue
+# Fixture to mock fetching jobs from RQ
 @pytest.fixture
-def mock_rq_queue(mocker):
-    mock_queue = mocker.patch("src.main.rq_queue")
-    return mock_queue
+def mock_fetch_job(mocker):
+    mock_fetch_job = mocker.patch("src.main.fetch_job")
+    return mock_fetch_job
 
 
-@patch("src.main.rq_queue.enqueue")
+# Fixture to mock the workers serving the queues
+@pytest.fixture(autouse=True)
+def mock_worker(mocker):
+    mock_worker = mocker.patch("src.main.Worker")
+    mock_worker.count.return_value = 1
+    return mock_worker
+
+
+# Fixture to mock the running totals of queued work kept in Redis
+@pytest.fixture(autouse=True)
+def mock_queue_time(mocker):
+    return mocker.patch(
+        "src.main.reserve_queue_time",
+        side_effect=lambda queue_name, seconds, enqueue: enqueue(MagicMock(), 120.0),
+    )
+
+
+@patch("src.queue.rq_queue.enqueue")
 @patch("src.main.tempfile.NamedTemporaryFile")
 def test_transcribe_success(mock_tempfile, mock_enqueue, client):
     # Setup the mock for NamedTemporaryFile
@@ -59,12 +77,27 @@ def test_transcribe_success(mock_tempfile, mock_enqueue, client):
     mock_enqueue.assert_called_once()
     enqueue_args, enqueue_kwargs = mock_enqueue.call_args
     assert enqueue_args[0] == transcribe_task
-    assert enqueue_kwargs["args"] == ("tempfile.wav",)
+    assert enqueue_kwargs["args"] == (
+        "tempfile.wav",
+        {
+            "model": DEFAULT_MODEL,
+            "language": "en",
+            "beam_size": 5,
+            "vad_filter": False,
+            "tier": "accurate",
+        },
+    )
     assert enqueue_kwargs["result_ttl"] == 3600 * 24 * 7
     assert enqueue_kwargs["job_timeout"] == 3600 * 4
 
+    assert enqueue_kwargs["meta"]["queued_after"] == 120.0
+
+    # Ensure the upload is named after the job
+    job_id = enqueue_kwargs["job_id"]
+    assert mock_tempfile.call_args.kwargs["prefix"] == f"{job_id}_"
+
 
-@patch("src.main.rq_queue.enqueue")
+@patch("src.queue.rq_queue.enqueue")
 @patch("src.main.tempfile.NamedTemporaryFile")
 def test_transcribe_no_data(mock_tempfile, mock_enqueue, client):
     # Simulate POST request with no data
@@ -77,7 +110,7 @@ def test_transcribe_no_data(mock_tempfile, mock_enqueue, client):
     mock_enqueue.assert_not_called()
 
 
-@patch("src.main.rq_queue.enqueue")
+@patch("src.queue.rq_queue.enqueue")
 @patch("src.main.tempfile.NamedTemporaryFile")
 def test_transcribe_enqueue_failure(mock_tempfile, mock_enqueue, client):
     # Setup the mock for NamedTemporaryFile
@@ -101,7 +134,7 @@ def test_transcribe_enqueue_failure(mock_tempfile, mock_enqueue, client):
     mock_file.close.assert_called_once()
 
 
-@patch("src.main.rq_queue.enqueue")
+@patch("src.queue.rq_queue.enqueue")
 @patch("src.main.tempfile.NamedTemporaryFile")
 def test_transcribe_exception_during_processing(mock_tempfile, mock_enqueue, client):
     # Setup the mock for NamedTemporaryFile to raise an exception when writing
@@ -122,6 +155,46 @@ def test_transcribe_exception_during_processing(mock_tempfile, mock_enqueue, cli
     mock_file.close.assert_called_once()
 
 
+@patch("src.main.get_queue")
+@patch("src.main.tempfile.NamedTemporaryFile")
+def test_transcribe_routes_model_to_queue(
+    mock_tempfile, mock_get_queue, client, mocker, mock_worker
+):
+    mocker.patch("src.options.MODELS", [DEFAULT_MODEL, "small"])
+    mock_file = MagicMock()
+    mock_file.name = "tempfile.wav"
+    mock_tempfile.return_value = mock_file
+    mock_queue = mock_get_queue.return_value
+    mock_queue.enqueue.return_value.get_id.return_value = "12345"
+
+    response = client.post(
+        "/transcribe?model=small&tier=fast",
+        data=b"test audio data",
+        content_type="application/octet-stream",
+    )
+
+    assert response.status_code == 201
+    # Both the worker check and the enqueue use the queue of the model
+    assert {c.args for c in mock_get_queue.call_args_list} == {("transcribe-small",)}
+    mock_worker.count.assert_called_once_with(queue=mock_queue)
+    _, enqueue_kwargs = mock_queue.enqueue.call_args
+    assert enqueue_kwargs["args"][1]["model"] == "small"
+    assert enqueue_kwargs["args"][1]["beam_size"] == 1
+
+
+@patch("src.queue.rq_queue.enqueue")
+@patch("src.main.tempfile.NamedTemporaryFile")
+def test_transcribe_invalid_options(mock_tempfile, mock_enqueue, client):
+    response = client.post(
+        "/transcribe?language=xx", data=b"test audio data", content_type="application/octet-stream"
+    )
+
+    assert response.status_code == 400
+    assert response.json["error"] == "Invalid language, expected a language code or auto."
+    mock_tempfile.assert_not_called()
+    mock_enqueue.assert_not_called()
+
+
 def test_get_job_info_success(client, mock_database):
     # Setup mock data
     job_id = "12345"
@@ -133,6 +206,8 @@ def test_get_job_info_success(client, mock_database):
         total_duration=200.0,
         running_time=100.0,
         creation_date=created,
+        language="en",
+        options={"model": "turbo", "language": None, "beam_size": 1, "vad_filter": True},
     )
 
     # Mock the database methods
@@ -151,9 +226,11 @@ def test_get_job_info_success(client, mock_database):
     assert data["totalDuration"] == transcription.total_duration
     assert data["runningTime"] == transcription.running_time
     assert data["creationDate"] == created.isoformat()
+    assert data["language"] == "en"
+    assert data["options"] == transcription.options
 
 
-def test_get_job_info_not_found(client, mock_database, mock_rq_queue):
+def test_get_job_info_not_found(client, mock_database, mock_fetch_job):
     # Setup mock data
     job_id = "nonexistent_id"
 
@@ -161,7 +238,7 @@ def test_get_job_info_not_found(client, mock_database, mock_rq_queue):
     mock_database.get_transcription.return_value = None
 
     # Mock the RQ fetch_job to return None (job not found in RQ)
-    mock_rq_queue.fetch_job.return_value = None
+    mock_fetch_job.return_value = None
 
     # Make the GET request
     response = client.get(f"/job/{job_id}")
@@ -173,9 +250,11 @@ def test_get_job_info_not_found(client, mock_database, mock_rq_queue):
     assert data["error"] == f"Job ID {job_id} not found."
 
 
-def test_get_job_info_processing(client, mock_database, mock_rq_queue):
+@patch("src.main.get_queue_estimate")
+def test_get_job_info_processing(mock_queue_estimate, client, mock_database, mock_fetch_job):
     # Setup mock data
     job_id = "processing_id"
+    mock_queue_estimate.return_value = {"queuePosition": 3, "estimatedSeconds": 90.0}
 
     # Mock the database methods to return None
     mock_database.get_transcription.return_value = None
@@ -187,7 +266,7 @@ def test_get_job_info_processing(client, mock_database, mock_rq_queue):
     mock_job.is_queued = True
 
     # Mock the RQ fetch_job to return the mock job
-    mock_rq_queue.fetch_job.return_value = mock_job
+    mock_fetch_job.return_value = mock_job
 
     # Make the GET request
     response = client.get(f"/job/{job_id}")
@@ -198,9 +277,34 @@ def test_get_job_info_processing(client, mock_database, mock_rq_queue):
     data = response.get_json()
     assert data["jobId"] == job_id
     assert data["status"] == "processing"
+    assert data["queuePosition"] == 3
+    assert data["estimatedSeconds"] == 90.0
+    mock_queue_estimate.assert_called_once_with(mock_job)
 
 
-def test_get_job_info_failure(client, mock_database, mock_rq_queue):
+@patch("src.main.get_queue_estimate")
+def test_get_job_info_processing_estimate_error(
+    mock_queue_estimate, client, mock_database, mock_fetch_job
+):
+    # Setup mock data
+    job_id = "processing_id"
+    mock_database.get_transcription.return_value = None
+    mock_queue_estimate.side_effect = Exception("Estimate failed")
+
+    mock_job = MagicMock()
+    mock_job.is_failed = False
+    mock_job.is_finished = False
+    mock_job.is_queued = True
+    mock_fetch_job.return_value = mock_job
+
+    response = client.get(f"/job/{job_id}")
+
+    # The status is still returned without the estimate
+    assert response.status_code == 200
+    assert response.get_json() == {"jobId": job_id, "status": "processing"}
+
+
+def test_get_job_info_failure(client, mock_database, mock_fetch_job):
     # Setup mock data
     job_id = "failed_id"
 
@@ -214,7 +318,7 @@ def test_get_job_info_failure(client, mock_database, mock_rq_queue):
     mock_job.is_queued = False
 
     # Mock the RQ fetch_job to return the mock job
-    mock_rq_queue.fetch_job.return_value = mock_job
+    mock_fetch_job.return_value = mock_job
 
     # Make the GET request
     response = client.get(f"/job/{job_id}")
@@ -227,7 +331,7 @@ def test_get_job_info_failure(client, mock_database, mock_rq_queue):
     assert data["status"] == "failure"
 
 
-def test_get_job_info_unknown_status(client, mock_database, mock_rq_queue, caplog):
+def test_get_job_info_unknown_status(client, mock_database, mock_fetch_job, caplog):
     # Setup mock data
     job_id = "unknown_status_id"
 
@@ -243,7 +347,7 @@ def test_get_job_info_unknown_status(client, mock_database, mock_rq_queue, caplo
     mock_job.is_deferred = False
 
     # Mock the RQ fetch_job to return the mock job
-    mock_rq_queue.fetch_job.return_value = mock_job
+    mock_fetch_job.return_value = mock_job
 
     # Make the GET request
     response = client.get(f"/job/{job_id}")
@@ -256,7 +360,7 @@ def test_get_job_info_unknown_status(client, mock_database, mock_rq_queue, caplo
     assert data["status"] == "unknown"
 
 
-def test_get_job_info_rq_exception(client, mock_database, mock_rq_queue, caplog):
+def test_get_job_info_rq_exception(client, mock_database, mock_fetch_job, caplog):
     # Setup mock data
     job_id = "error_id"
 
@@ -266,7 +370,7 @@ def test_get_job_info_rq_exception(client, mock_database, mock_rq_queue, caplog)
     # Mock the RQ fetch_job to raise a Redis ConnectionError
     from redis.exceptions import ConnectionError
 
-    mock_rq_queue.fetch_job.side_effect = ConnectionError("Mocked Redis connection error")
+    mock_fetch_job.side_effect = ConnectionError("Mocked Redis connection error")
 
     # Make the GET request
     response = client.get(f"/job/{job_id}")
@@ -279,3 +383,163 @@ def test_get_job_info_rq_exception(client, mock_database, mock_rq_queue, caplog)
 
     # Check if the error was logged
     assert "Error fetching job info for job_id error_id" in caplog.text
+
+
+@patch("src.queue.rq_queue.enqueue")
+@patch("src.main.tempfile.NamedTemporaryFile")
+def test_transcribe_profile_header(mock_tempfile, mock_enqueue, client):
+    mock_file = MagicMock()
+    mock_file.name = "tempfile.wav"
+    mock_tempfile.return_value = mock_file
+    mock_enqueue.return_value.get_id.return_value = "12345"
+
+    # Request profiling through the header
+    response = client.post(
+        "/transcribe",
+        data=b"test audio data",
+        content_type="application/octet-stream",
+        headers={"X-Profile": "1"},
+    )
+
+    assert response.status_code == 201
+    _, enqueue_kwargs = mock_enqueue.call_args
+    assert enqueue_kwargs["meta"]["profile"] is True
+
+
+@patch("src.queue.rq_queue.enqueue")
+@patch("src.main.tempfile.NamedTemporaryFile")
+def test_transcribe_profile_disabled_by_default(mock_tempfile, mock_enqueue, client):
+    mock_file = MagicMock()
+    mock_file.name = "tempfile.wav"
+    mock_tempfile.return_value = mock_file
+    mock_enqueue.return_value.get_id.return_value = "12345"
+
+    response = client.post(
+        "/transcribe", data=b"test audio data", content_type="application/octet-stream"
+    )
+
+    assert response.status_code == 201
+    _, enqueue_kwargs = mock_enqueue.call_args
+    assert enqueue_kwargs["meta"]["profile"] is False
+
+
+@patch("src.main.get_profile")
+def test_get_job_profile_success(mock_get_profile, client):
+    profile = {
+        "jobId": "12345",
+        "totalTime": 12.5,
+        "peakMemoryBytes": 1024,
+        "stages": {"decode": 1.0, "feature_extraction": 0.5, "generate": 11.0},
+        "profile": "ncalls  tottime  percall  cumtime  percall filename:lineno(function)",
+    }
+    mock_get_profile.return_value = profile
+
+    response = client.get("/job/12345/profile")
+
+    assert response.status_code == 200
+    assert response.get_json() == profile
+    mock_get_profile.assert_called_once_with("12345")
+
+
+@patch("src.main.get_profile")
+def test_get_job_profile_not_found(mock_get_profile, client):
+    mock_get_profile.return_value = None
+
+    response = client.get("/job/12345/profile")
+
+    assert response.status_code == 404
+    assert response.get_json()["error"] == "No profile found for job ID 12345."
+
+
+@patch("src.main.delete_file")
+@patch("src.queue.rq_queue.enqueue")
+@patch("src.main.tempfile.NamedTemporaryFile")
+def test_transcribe_enqueue_failure_deletes_file(
+    mock_tempfile, mock_enqueue, mock_delete_file, client
+):
+    mock_file = MagicMock()
+    mock_file.name = "tempfile.wav"
+    mock_tempfile.return_value = mock_file
+    mock_enqueue.side_effect = Exception("Enqueue failed")
+
+    response = client.post(
+        "/transcribe", data=b"test audio data", content_type="application/octet-stream"
+    )
+
+    assert response.status_code == 500
+    mock_delete_file.assert_called_once_with("tempfile.wav")
+
+
+@patch("src.main.check_capacity")
+@patch("src.queue.rq_queue.enqueue")
+@patch("src.main.tempfile.NamedTemporaryFile")
+def test_transcribe_over_capacity(mock_tempfile, mock_enqueue, mock_check_capacity, client):
+    mock_check_capacity.return_value = "Transcription queue is full."
+
+    response = client.post(
+        "/transcribe", data=b"test audio data", content_type="application/octet-stream"
+    )
+
+    assert response.status_code == 503
+    assert response.json["error"] == "Transcription queue is full."
+    assert response.headers["Retry-After"] == "60"
+    mock_check_capacity.assert_called_once_with(len(b"test audio data"))
+
+    # Ensure nothing was written or enqueued
+    mock_tempfile.assert_not_called()
+    mock_enqueue.assert_not_called()
+
+
+@patch("src.main.MAX_CONTENT_LENGTH", 10)
+@patch("src.queue.rq_queue.enqueue")
+@patch("src.main.tempfile.NamedTemporaryFile")
+def test_transcribe_file_too_large(mock_tempfile, mock_enqueue, client):
+    response = client.post(
+        "/transcribe", data=b"test audio data", content_type="application/octet-stream"
+    )
+
+    assert response.status_code == 413
+    assert response.json["error"] == "File too large."
+    mock_tempfile.assert_not_called()
+    mock_enqueue.assert_not_called()
+
+
+@patch("src.main.get_queue")
+@patch("src.main.tempfile.NamedTemporaryFile")
+def test_transcribe_default_model_without_workers(
+    mock_tempfile, mock_get_queue, client, mock_worker
+):
+    mock_worker.count.return_value = 0
+    mock_tempfile.return_value.name = "tempfile.wav"
+    mock_get_queue.return_value.enqueue.return_value.get_id.return_value = "12345"
+
+    response = client.post(
+        "/transcribe", data=b"test audio data", content_type="application/octet-stream"
+    )
+
+    # The job waits in the queue until the workers of the default model are up
+    assert response.status_code == 201
+    mock_worker.count.assert_not_called()
+
+
+@patch("src.main.get_queue")
+@patch("src.main.tempfile.NamedTemporaryFile")
+def test_transcribe_model_without_workers(
+    mock_tempfile, mock_get_queue, client, mocker, mock_worker
+):
+    mocker.patch("src.options.MODELS", [DEFAULT_MODEL, "small"])
+    mock_worker.count.return_value = 0
+
+    response = client.post(
+        "/transcribe?model=small",
+        data=b"test audio data",
+        content_type="application/octet-stream",
+    )
+
+    assert response.status_code == 503
+    assert response.json["error"] == "No worker is serving model small."
+    assert response.headers["Retry-After"] == "60"
+    mock_get_queue.assert_called_once_with("transcribe-small")
+    mock_worker.count.assert_called_once_with(queue=mock_get_queue.return_value)
+    mock_tempfile.assert_not_called()
+    mock_get_queue.return_value.enqueue.assert_not_called()
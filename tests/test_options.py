@@ -0,0 +1,67 @@
+# tests/test_options.py
+
+import pytest
+from src.options import DEFAULT_MODEL, parse_options, queue_name, stats_key
+
+
+def test_default_options():
+    options = parse_options({})
+
+    assert options.model == DEFAULT_MODEL
+    assert options.language == "en"
+    assert options.beam_size == 5
+    assert options.vad_filter is False
+    assert options.tier == "accurate"
+
+
+def test_fast_tier():
+    options = parse_options({"tier": "fast"})
+
+    assert options.beam_size == 1
+    assert options.vad_filter is True
+
+
+def test_explicit_options_override_tier():
+    options = parse_options(
+        {"tier": "fast", "language": "auto", "beam_size": "3", "vad_filter": "false"}
+    )
+
+    assert options.language is None
+    assert options.beam_size == 3
+    assert options.vad_filter is False
+
+
+@pytest.mark.parametrize(
+    "params, error",
+    [
+        ({"temperature": "1"}, "Unknown option: temperature."),
+        ({"tier": "slow"}, "Invalid tier, expected one of: accurate, fast."),
+        ({"model": "unknown"}, "Invalid model"),
+        ({"language": "xx"}, "Invalid language"),
+        ({"beam_size": "five"}, "Invalid beam_size, expected an integer."),
+        ({"beam_size": "100"}, "Invalid beam_size"),
+        ({"vad_filter": "maybe"}, "Invalid vad_filter"),
+    ],
+)
+def test_invalid_options(params, error):
+    with pytest.raises(ValueError, match=error):
+        parse_options(params)
+
+
+def test_english_only_model(mocker):
+    mocker.patch("src.options.MODELS", [DEFAULT_MODEL, "small.en"])
+
+    assert parse_options({"model": "small.en", "language": "auto"}).language is None
+    with pytest.raises(ValueError, match="Model small.en only supports English."):
+        parse_options({"model": "small.en", "language": "de"})
+
+
+def test_queue_name():
+    assert queue_name(DEFAULT_MODEL) == "default"
+    assert queue_name("small") == "transcribe-small"
+
+
+def test_stats_key():
+    assert stats_key({"model": "small", "tier": "fast"}) == "small/fast"
+    # Jobs enqueued before options were supported ran the accurate tier
+    assert stats_key(None) == f"{DEFAULT_MODEL}/accurate"
@@ -0,0 +1,32 @@
+# tests/test_profiling.py
+
+from unittest.mock import patch
+
+from src.profiling import JobProfiler
+
+
+@patch("src.profiling.save_profile")
+def test_profiler_disabled_is_noop(mock_save_profile):
+    with JobProfiler("12345") as profiler:
+        with profiler.stage("decode"):
+            pass
+
+    assert profiler.stages == {}
+    mock_save_profile.assert_not_called()
+
+
+@patch("src.profiling.save_profile")
+def test_profiler_enabled_saves_artifact(mock_save_profile):
+    with JobProfiler("12345", enabled=True) as profiler:
+        with profiler.stage("decode"):
+            sum(range(1000))
+        with profiler.stage("generate"):
+            [str(i) for i in range(1000)]
+
+    mock_save_profile.assert_called_once()
+    job_id, artifact = mock_save_profile.call_args[0]
+    assert job_id == "12345"
+    assert set(artifact["stages"]) == {"decode", "generate"}
+    assert artifact["totalTime"] >= sum(artifact["stages"].values())
+    assert artifact["peakMemoryBytes"] > 0
+    assert "cumulative" in artifact["profile"]
@@ -0,0 +1,122 @@
+# tests/test_spool.py
+
+import os
+import time
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+from rq.job import JobStatus
+from src import spool
+
+
+@pytest.fixture
+def uploads(tmp_path, mocker):
+    mocker.patch("src.spool.UPLOADS_PATH", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def mock_rq_queue(mocker):
+    mock_queue = MagicMock()
+    mocker.patch("src.spool.get_queues", return_value=[mock_queue])
+    mock_queue.get_job_ids.return_value = []
+    for registry in (
+        mock_queue.started_job_registry,
+        mock_queue.deferred_job_registry,
+        mock_queue.scheduled_job_registry,
+    ):
+        registry.get_job_ids.return_value = []
+    return mock_queue
+
+
+def make_upload(uploads, name, age=3600, size=10):
+    path = uploads / name
+    path.write_bytes(b"0" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_sweep_deletes_orphans_only(uploads, mock_rq_queue, mocker):
+    live = make_upload(uploads, "live")
+    orphan = make_upload(uploads, "orphan")
+    recent = make_upload(uploads, "recent", age=0)
+
+    job = MagicMock()
+    job.args = (live,)
+    mock_rq_queue.get_job_ids.return_value = ["live_job"]
+    mocker.patch("src.spool.Job.fetch_many", return_value=[job])
+
+    deleted = spool.sweep_orphans()
+
+    assert deleted == [orphan]
+    assert os.path.exists(live)
+    assert os.path.exists(recent)
+    assert not os.path.exists(orphan)
+
+
+def test_sweep_checks_job_status(uploads, mock_rq_queue, mocker):
+    popped_id, finished_id, missing_id = (str(uuid4()) for _ in range(3))
+    # Popped from the queue by a worker but not yet in the started registry
+    popped = make_upload(uploads, f"{popped_id}_upload")
+    finished = make_upload(uploads, f"{finished_id}_upload")
+    missing = make_upload(uploads, f"{missing_id}_upload")
+
+    def fetch_many(job_ids, connection):
+        statuses = {popped_id: JobStatus.QUEUED, finished_id: JobStatus.FINISHED}
+        jobs = []
+        for job_id in job_ids:
+            job = None
+            if job_id in statuses:
+                job = MagicMock()
+                job.get_status.return_value = statuses[job_id]
+            jobs.append(job)
+        return jobs
+
+    mocker.patch("src.spool.Job.fetch_many", side_effect=fetch_many)
+
+    deleted = spool.sweep_orphans()
+
+    assert sorted(deleted) == sorted([finished, missing])
+    assert os.path.exists(popped)
+    # The registries are only scanned for uploads without a job id
+    mock_rq_queue.get_job_ids.assert_not_called()
+
+
+def test_upload_job_id():
+    job_id = str(uuid4())
+
+    assert spool.upload_job_id(f"/uploads/{spool.upload_prefix(job_id)}abc") == job_id
+    assert spool.upload_job_id("/uploads/tmpabc") is None
+    assert spool.upload_job_id("/uploads/not_a_uuid") is None
+
+
+def test_sweep_disabled(uploads, mock_rq_queue, mocker):
+    mocker.patch("src.spool.DELETE_UPLOADED_FILES", False)
+    orphan = make_upload(uploads, "orphan")
+
+    assert spool.sweep_orphans() == []
+    assert os.path.exists(orphan)
+
+
+def test_check_capacity_unlimited(uploads, mock_rq_queue, mocker):
+    mock_get_queues = mocker.patch("src.spool.get_queues")
+
+    assert spool.check_capacity(10**12) is None
+    mock_get_queues.assert_not_called()
+
+
+def test_check_capacity_queue_depth(uploads, mock_rq_queue, mocker):
+    mocker.patch("src.spool.MAX_QUEUE_DEPTH", 5)
+    mock_rq_queue.count = 5
+
+    assert spool.check_capacity(10) == "Transcription queue is full."
+
+
+def test_check_capacity_spool_size(uploads, mock_rq_queue, mocker):
+    mocker.patch("src.spool.MAX_SPOOL_SIZE", 100)
+    make_upload(uploads, "pending", size=60)
+
+    assert spool.check_capacity(30) is None
+    assert spool.check_capacity(50) == "Upload storage is full."
@@ -1,4 +1,20 @@
+import os
 import sys
 
 sys.path.append("./src")
 from src.main import app  # noqa: F401
+from src.jobs import load_model
+from src.options import DEFAULT_MODEL, queue_name
+
+# Models served by this worker, each one is listened for on its own queue
+WORKER_MODELS = [
+    model.strip()
+    for model in (os.getenv("WORKER_MODELS") or DEFAULT_MODEL).split(",")
+    if model.strip()
+]
+QUEUES = [queue_name(model) for model in WORKER_MODELS]
+
+# Preload the models, run with rq.worker.SimpleWorker so jobs reuse them instead of
+# loading them again in a forked work horse
+for model in WORKER_MODELS:
+    load_model(model)